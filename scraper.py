@@ -1,19 +1,44 @@
 import pdfplumber
+import pypdfium2 as pdfium
 import requests
 import json
 import re
 import hashlib
+import heapq
+import io
 import os
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from urllib.parse import urljoin
 from zoneinfo import ZoneInfo
 from typing import Dict, List, Tuple, Optional, Set
+from pdfplumber.utils import clip_obj, curve_to_edges, extract_words, line_to_edge, rect_to_edges
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 RO_TZ = ZoneInfo("Europe/Bucharest")
 URL = "https://brukenthal.ro/"
 HEADERS = {"User-Agent": "Mozilla/5.0"}
 OUTPUT_FILE = "timetable.json"
 
+# probe PDFs are downloaded concurrently (network-bound), then inspected in order;
+# one download in flight per kind still missing (liceu, gimnaziu)
+PROBE_WORKERS = 2
+
+# one keep-alive connection pool for the landing page, PDF downloads and the
+# worker notify; sized so both probe threads get their own pooled connection,
+# with a few retries on connection errors
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=PROBE_WORKERS,
+    max_retries=Retry(total=3, backoff_factor=0.3),
+))
+
 # Cloudflare Worker notify endpoint (optional)
 WORKER_NOTIFY_URL = "https://shrill-tooth-d37a.ronzigamespro2007.workers.dev/notify"
 WORKER_AUTH_KEY = os.getenv("WORKER_AUTH_KEY", "")
@@ -37,6 +62,11 @@ KIND_TO_CLASSES: Dict[str, List[str]] = {
     "gimnaziu": GIMNAZIU_CLASSES,
 }
 
+# exact class labels ("10A") as they appear in a header row
+CLASS_LABEL_RE: Dict[str, re.Pattern] = {
+    cls: re.compile(rf"\b{re.escape(cls)}\b") for cls in LICEU_CLASSES + GIMNAZIU_CLASSES
+}
+
 DAY_MARKERS = {
     "MONTAG": "Luni",
     "DIENSTAG": "Marti",
@@ -46,55 +76,58 @@ DAY_MARKERS = {
 }
 
 TIME_RE = re.compile(r"^\d{1,2}:\d{2}\s*[-–]\s*\d{1,2}:\d{2}$")
+WS_RE = re.compile(r"\s+")
+# a single stray lowercase prefix glued to a subject (OCR artifact, e.g. "aXxx")
+STRAY_PREFIX_RE = re.compile(r"^[a-z](?=[A-Z0-9ĂÂÎȘȚ])")
+DASH_RE = re.compile(r"\s*-\s*")
+PDF_HREF_RE = re.compile(r'href=["\']([^"\']+\.pdf)["\']', re.IGNORECASE)
+DIGITS_RE = re.compile(r"\d+")
+
+# The class header row is searched for among the first rows of a day block
+HEADER_SEARCH_ROWS = 12
 
 # Heuristic keywords that indicate a room/lab note in header (if class token is missing)
 NOTE_HINTS = ("cab", "lab", "sala", "sală", "clasa", "clasă", "cl.", "cls", "aula")
 
 
-def file_hash(path: str) -> str:
-    h = hashlib.sha256()
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            h.update(chunk)
-    return h.hexdigest()
-
-
 def cluster_positions(values: List[float], tol: float = 1.5) -> List[float]:
-    values = sorted(values)
+    # each cluster is [sum, count, last value]; no per-cluster member lists
     clusters: List[List[float]] = []
-    for v in values:
-        if not clusters or abs(v - clusters[-1][-1]) > tol:
-            clusters.append([v])
+    for v in sorted(values):
+        if not clusters or v - clusters[-1][2] > tol:
+            clusters.append([v, 1, v])
         else:
-            clusters[-1].append(v)
-    return [sum(c) / len(c) for c in clusters]
+            c = clusters[-1]
+            c[0] += v
+            c[1] += 1
+            c[2] = v
+    return [total / count for total, count, _ in clusters]
 
 
 def normalize_ws(s: str) -> str:
-    return re.sub(r"\s+", " ", (s or "").strip())
+    return WS_RE.sub(" ", (s or "").strip())
 
 
+# cell texts repeat a lot across rows, days and classes
+@lru_cache(maxsize=4096)
 def normalize_time_text(s: str) -> str:
     s = normalize_ws(s)
     s = s.replace("–", "-")
-    s = re.sub(r"\s*-\s*", "-", s)
+    s = DASH_RE.sub("-", s)
     return s
 
 
-def is_time_slot(s: str) -> bool:
-    s = normalize_ws(s)
-    return bool(TIME_RE.match(s))
-
-
+@lru_cache(maxsize=4096)
 def normalize_subject(subj: str) -> str:
     subj = normalize_ws(subj)
 
-    # junk single lowercase
-    if re.fullmatch(r"[a-z]", subj):
+    # empty cells and junk single chars (e.g. a lone lowercase letter)
+    if len(subj) < 2:
         return ""
 
     # remove a single stray lowercase prefix only if it's clearly an OCR artifact (aXxx)
-    subj = re.sub(r"^[a-z](?=[A-Z0-9ĂÂÎȘȚ])", "", subj).strip()
+    if "a" <= subj[0] <= "z":
+        subj = STRAY_PREFIX_RE.sub("", subj).strip()
 
     if len(subj) < 2:
         return ""
@@ -106,15 +139,13 @@ def normalize_subject(subj: str) -> str:
 # ---------------------------
 
 def get_all_pdf_urls() -> List[str]:
-    html = requests.get(URL, headers=HEADERS, timeout=30).text
-    hrefs = re.findall(r'href=["\']([^"\']+\.pdf)["\']', html, flags=re.IGNORECASE)
-    urls = [urljoin(URL, h) for h in hrefs]
+    html = SESSION.get(URL, timeout=30).text
 
     # dedupe, keep order
     seen: Set[str] = set()
     out: List[str] = []
-    for u in urls:
-        u = u.split("#", 1)[0]
+    for m in PDF_HREF_RE.finditer(html):
+        u = urljoin(URL, m.group(1)).split("#", 1)[0]
         if u not in seen:
             seen.add(u)
             out.append(u)
@@ -122,7 +153,7 @@ def get_all_pdf_urls() -> List[str]:
 
 
 def url_score(u: str) -> List[int]:
-    nums = re.findall(r"\d+", u)
+    nums = DIGITS_RE.findall(u)
     return [int(n) for n in nums] if nums else [0]
 
 
@@ -132,97 +163,159 @@ def class_token_regex(cls: str) -> str:
     return rf"\b{re.escape(digits)}\s*{re.escape(letter)}\b"
 
 
-def detect_pdf_kind_fast(pdf_path: str) -> Optional[str]:
+# compiled once; kind detection searches every class on every probed PDF
+CLASS_TOKEN_RE: Dict[str, re.Pattern] = {
+    cls: re.compile(class_token_regex(cls)) for cls in LICEU_CLASSES + GIMNAZIU_CLASSES
+}
+
+
+def count_class_hits(classes: List[str], text: str) -> int:
+    # text is whitespace-normalized, so "10A" and "10 A" are the only spellings
+    # the token regex can match; a plain substring check rules most classes out
+    return sum(
+        1 for c in classes
+        if (c in text or f"{c[:-1]} {c[-1]}" in text) and CLASS_TOKEN_RE[c].search(text)
+    )
+
+
+def kind_from_hits(liceu_hits: int, gim_hits: int) -> Optional[str]:
+    if liceu_hits >= 4 and liceu_hits > gim_hits:
+        return "liceu"
+    if gim_hits >= 4 and gim_hits > liceu_hits:
+        return "gimnaziu"
+    return None
+
+
+def first_page_text(pdf_bytes: bytes) -> str:
+    # pdfium's native text extraction; much cheaper than a pdfminer layout pass
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    try:
+        return pdf[0].get_textpage().get_text_range()
+    finally:
+        pdf.close()
+
+
+def detect_pdf_kind_fast(pdf_bytes: bytes) -> Optional[str]:
     """
     Return 'liceu' / 'gimnaziu' / None by scanning first page text for class tokens.
+    pdfium text is tried first; pdfplumber is only opened if that is inconclusive.
     """
     try:
-        with pdfplumber.open(pdf_path) as pdf:
+        text = normalize_ws(first_page_text(pdf_bytes))
+        kind = kind_from_hits(count_class_hits(LICEU_CLASSES, text), count_class_hits(GIMNAZIU_CLASSES, text))
+        if kind:
+            return kind
+    except Exception:
+        pass
+
+    try:
+        # only the first page is ever read; don't build Page objects for the rest
+        with pdfplumber.open(io.BytesIO(pdf_bytes), pages=[1]) as pdf:
             page = pdf.pages[0]
             text = page.extract_text() or ""
             text = normalize_ws(text)
 
-            liceu_hits = sum(1 for c in LICEU_CLASSES if re.search(class_token_regex(c), text))
-            gim_hits = sum(1 for c in GIMNAZIU_CLASSES if re.search(class_token_regex(c), text))
+            liceu_hits = count_class_hits(LICEU_CLASSES, text)
+            gim_hits = count_class_hits(GIMNAZIU_CLASSES, text)
 
             # fallback: sometimes extract_text is poor; try words
             if max(liceu_hits, gim_hits) < 4:
                 words = page.extract_words(x_tolerance=2, y_tolerance=2) or []
                 wtext = normalize_ws(" ".join(w.get("text", "") for w in words))
-                liceu_hits = max(liceu_hits, sum(1 for c in LICEU_CLASSES if re.search(class_token_regex(c), wtext)))
-                gim_hits = max(gim_hits, sum(1 for c in GIMNAZIU_CLASSES if re.search(class_token_regex(c), wtext)))
+                liceu_hits = max(liceu_hits, count_class_hits(LICEU_CLASSES, wtext))
+                gim_hits = max(gim_hits, count_class_hits(GIMNAZIU_CLASSES, wtext))
 
-            if liceu_hits >= 4 and liceu_hits > gim_hits:
-                return "liceu"
-            if gim_hits >= 4 and gim_hits > liceu_hits:
-                return "gimnaziu"
-            return None
+            return kind_from_hits(liceu_hits, gim_hits)
     except Exception:
         return None
 
 
-def pick_latest_pdfs_by_kind(max_probe: int = 8) -> Dict[str, Dict[str, str]]:
+def pick_latest_pdfs_by_kind(
+    max_probe: int = 8,
+    old_sources: Optional[Dict[str, Dict[str, str]]] = None,
+) -> Dict[str, dict]:
     """
     Downloads up to max_probe newest-ish PDFs and assigns them to liceu/gimnaziu
     based on content. Returns:
       {
-        "liceu": {"url": ..., "tmp": ...},
-        "gimnaziu": {"url": ..., "tmp": ...}
+        "liceu": {"url": ..., "pdf": b"...", "pdf_hash": ..., "etag": ..., "last_modified": ...},
+        "gimnaziu": {"url": ..., "pdf": b"...", "pdf_hash": ..., "etag": ..., "last_modified": ...}
       }
-    Keeps temp files for the winners (caller will parse & delete).
+    PDFs are kept in memory only. URLs are walked in newest-first order with
+    at most one download in flight per kind still missing, so older PDFs are
+    only fetched while a kind has not been found yet.
+    URLs already known from old_sources are fetched conditionally; if the
+    server answers 304 the kind is returned with "pdf" set to None.
     """
     pdf_urls = get_all_pdf_urls()
     if not pdf_urls:
         return {}
 
-    pdf_urls.sort(key=url_score, reverse=True)
+    # only the newest max_probe are needed; same order (and tie order) as a full sort
+    probe_urls = heapq.nlargest(max_probe, pdf_urls, key=url_score)
 
-    found: Dict[str, Dict[str, str]] = {}
-    for i, u in enumerate(pdf_urls[:max_probe]):
-        tmp = f"temp_probe_{i}.pdf"
-        try:
-            download_to_tmp(u, tmp)
-        except Exception:
+    old_sources = old_sources or {}
+    url_to_kind = {
+        (info or {}).get("source_pdf"): kind
+        for kind, info in old_sources.items()
+        if (info or {}).get("source_pdf")
+    }
+
+    found: Dict[str, dict] = {}
+    queued = iter(probe_urls)
+    pending = deque()  # (url, future), newest first
+    with ThreadPoolExecutor(max_workers=PROBE_WORKERS) as ex:
+        while "liceu" not in found or "gimnaziu" not in found:
+            # one download in flight per kind still missing, so a 304 for both
+            # known sources never pulls the older PDFs behind them; once one kind
+            # is in, the rest are probed one at a time
+            in_flight = PROBE_WORKERS - len(found)
+            while len(pending) < in_flight:
+                u = next(queued, None)
+                if u is None:
+                    break
+                pending.append((u, ex.submit(download_pdf, u, old_sources.get(url_to_kind.get(u)))))
+            if not pending:
+                break
+
+            u, fut = pending.popleft()
             try:
-                if os.path.exists(tmp):
-                    os.remove(tmp)
-            except OSError:
-                pass
-            continue
+                downloaded = fut.result()
+            except Exception:
+                continue
 
-        kind = detect_pdf_kind_fast(tmp)
+            if downloaded is None:
+                # 304 Not Modified: same PDF as last run, nothing was downloaded
+                old_kind = url_to_kind[u]
+                if old_kind not in found:
+                    found[old_kind] = {"url": u, "pdf": None}
+                continue
 
-        # If can't detect, discard (or you can keep and try heavier logic)
-        if kind not in ("liceu", "gimnaziu"):
-            try:
-                os.remove(tmp)
-            except OSError:
-                pass
-            continue
+            pdf_bytes, meta = downloaded
+            kind = detect_pdf_kind_fast(pdf_bytes)
 
-        # keep first (newest by our sort) per kind
-        if kind not in found:
-            found[kind] = {"url": u, "tmp": tmp}
-        else:
-            try:
-                os.remove(tmp)
-            except OSError:
-                pass
+            # If can't detect, discard (or you can keep and try heavier logic)
+            if kind not in ("liceu", "gimnaziu"):
+                continue
 
-        if "liceu" in found and "gimnaziu" in found:
-            break
+            # keep first (newest by our sort) per kind
+            if kind not in found:
+                found[kind] = {"url": u, "pdf": pdf_bytes, **meta}
 
     return found
 
 
 # ---------------------------
-# Existing parsing logic (unchanged)
+# Timetable grid parsing
 # ---------------------------
 
-def find_day_zones(page) -> List[Dict[str, float]]:
-    words = page.extract_words(x_tolerance=2, y_tolerance=2)
+def find_day_zones(chars) -> List[Dict[str, float]]:
+    """
+    Find the day headers (MONTAG/DIENSTAG/...) among the words pdfplumber's
+    extract_words builds from the page chars (the same list parse_pdf uses).
+    """
     zones = []
-    for w in words:
+    for w in extract_words(chars, x_tolerance=2, y_tolerance=2):
         t = (w.get("text") or "").upper()
         if t in DAY_MARKERS:
             zones.append({"day": DAY_MARKERS[t], "top": w["top"], "bottom": w["bottom"]})
@@ -230,26 +323,102 @@ def find_day_zones(page) -> List[Dict[str, float]]:
     return zones
 
 
-def get_global_x_bounds(page) -> List[float]:
-    verts = [e for e in page.edges if e.get("orientation") == "v"]
+def split_edges(edges) -> Tuple[list, list]:
+    """Partition edges into (vertical, horizontal) in a single pass."""
+    verts, horiz = [], []
+    for e in edges:
+        orientation = e.get("orientation")
+        if orientation == "v":
+            verts.append(e)
+        elif orientation == "h":
+            horiz.append(e)
+    return verts, horiz
+
+
+def band_chars(chars, char_tops: List[float], max_h: float, bbox) -> list:
+    """
+    The chars page.crop(bbox).chars would hold, in (top, x0) order. chars must
+    be sorted by (top, x0) with char_tops their tops; anything overlapping the
+    band can start at most max_h above it. Chars straddling the band limits
+    are clipped to it, like crop does, which also moves their centers inside.
+    """
+    x0, top, x1, bottom = bbox
+    picked = []
+    clipped_top = False
+    for ch in chars[bisect_left(char_tops, top - max_h):bisect_right(char_tops, bottom)]:
+        if ch["bottom"] < top:
+            continue
+        if (
+            ch["x0"] >= x0 and ch["x1"] <= x1 and ch["top"] >= top and ch["bottom"] <= bottom
+            and (ch["x1"] - ch["x0"]) + (ch["bottom"] - ch["top"]) > 0
+        ):
+            picked.append(ch)  # fully inside: crop would keep it unchanged
+            continue
+        clipped = clip_obj(ch, bbox)
+        if clipped is None:
+            continue
+        clipped_top = clipped_top or clipped["top"] != ch["top"]
+        picked.append(clipped)
+    if clipped_top:
+        picked.sort(key=lambda ch: (ch["top"], ch["x0"]))
+    return picked
+
+
+def graphics_by_bottom(lines, rects, curves):
+    """
+    Page lines, rects and curves as (edge builder, obj) pairs sorted once by
+    bottom, plus the sorted bottoms, so each day band can bisect to the
+    objects that reach it instead of scanning the whole page.
+    """
+    def line_edges(obj):
+        return [line_to_edge(obj)]
+
+    objs = sorted(
+        [(line_edges, o) for o in lines]
+        + [(rect_to_edges, o) for o in rects]
+        + [(curve_to_edges, o) for o in curves],
+        key=lambda item: item[1]["bottom"],
+    )
+    return objs, [o["bottom"] for _, o in objs]
+
+
+def band_horizontals(objs, bottoms: List[float], bbox) -> list:
+    """
+    The horizontal edges page.crop(bbox).edges would hold. objs and bottoms
+    come from graphics_by_bottom. Objects are clipped to the band first, so
+    a rect running past a band limit (a table border, a merged cell) still
+    yields an edge at that limit.
+    """
+    top, bottom = bbox[1], bbox[3]
+    horiz = []
+    for to_edges, obj in objs[bisect_left(bottoms, top):]:
+        if obj["top"] > bottom:
+            continue
+        c = clip_obj(obj, bbox)
+        if c is None:
+            continue
+        horiz.extend(e for e in to_edges(c) if e.get("orientation") == "h")
+    return horiz
+
+
+def get_global_x_bounds(verts) -> List[float]:
     xs = [e["x0"] for e in verts]
     x_bounds = sorted(cluster_positions(xs, tol=1.5))
 
     # prefer a window of 18 boundaries (17 columns = Time + 16 classes)
     if len(x_bounds) > 18:
-        best = None
-        for i in range(0, len(x_bounds) - 17):
-            cand = x_bounds[i:i + 18]
-            width = cand[-1] - cand[0]
-            if best is None or width > best[0]:
-                best = (width, cand)
-        x_bounds = best[1]
+        best_i = 0
+        best_w = x_bounds[17] - x_bounds[0]
+        for i in range(1, len(x_bounds) - 17):
+            w = x_bounds[i + 17] - x_bounds[i]
+            if w > best_w:
+                best_w, best_i = w, i
+        x_bounds = x_bounds[best_i:best_i + 18]
 
     return x_bounds
 
 
-def get_y_bounds_for_crop(page_crop) -> List[float]:
-    horiz = [e for e in page_crop.edges if e.get("orientation") == "h"]
+def get_y_bounds(horiz) -> List[float]:
     ys = [e["top"] for e in horiz]
     y_bounds = sorted(cluster_positions(ys, tol=1.5))
 
@@ -260,41 +429,68 @@ def get_y_bounds_for_crop(page_crop) -> List[float]:
     return cleaned
 
 
-def cell_text_from_chars(
+def build_cell_char_map(
     chars,
-    x0, x1, y0, y1,
-    y_tol=1.2,
-    x_gap=1.0,
+    x_bounds: List[float],
+    y_bounds: List[float],
     x_pad_left=1.4,
     x_pad_right=0.35,
     y_pad=0.2
-) -> str:
-    sx0 = x0 + x_pad_left
-    sx1 = x1 - x_pad_right
-    sy0 = y0 + y_pad
-    sy1 = y1 - y_pad
-
-    if sx1 <= sx0:
-        sx0, sx1 = x0, x1
-    if sy1 <= sy0:
-        sy0, sy1 = y0, y1
-
-    sel = []
+) -> Dict[Tuple[int, int], list]:
+    """
+    Bucket chars into (row, col) grid cells in a single pass.
+    Bounds are sorted, so each char center is located with a binary search
+    instead of being tested against every cell. A char only counts for its
+    cell if its center lies inside the cell shrunk by the paddings.
+    Each bucket keeps the order of the input chars.
+    """
+    n_rows = len(y_bounds) - 1
+    n_cols = len(x_bounds) - 1
+
+    # padded inner limits per column / row, computed once per block
+    col_lo: List[float] = []
+    col_hi: List[float] = []
+    for c in range(n_cols):
+        x0, x1 = x_bounds[c], x_bounds[c + 1]
+        sx0, sx1 = x0 + x_pad_left, x1 - x_pad_right
+        if sx1 <= sx0:
+            sx0, sx1 = x0, x1
+        col_lo.append(sx0)
+        col_hi.append(sx1)
+
+    row_lo: List[float] = []
+    row_hi: List[float] = []
+    for r in range(n_rows):
+        y0, y1 = y_bounds[r], y_bounds[r + 1]
+        sy0, sy1 = y0 + y_pad, y1 - y_pad
+        if sy1 <= sy0:
+            sy0, sy1 = y0, y1
+        row_lo.append(sy0)
+        row_hi.append(sy1)
+
+    cells: Dict[Tuple[int, int], list] = {}
     for ch in chars:
         cx = (ch["x0"] + ch["x1"]) / 2
+        c = bisect_right(x_bounds, cx) - 1
+        if not (0 <= c < n_cols and col_lo[c] < cx < col_hi[c]):
+            continue
         cy = (ch["top"] + ch["bottom"]) / 2
-        if (sx0 < cx < sx1) and (sy0 < cy < sy1):
-            sel.append(ch)
+        r = bisect_right(y_bounds, cy) - 1
+        if not (0 <= r < n_rows and row_lo[r] < cy < row_hi[r]):
+            continue
+        cells.setdefault((r, c), []).append(ch)
+    return cells
 
-    if not sel:
-        return ""
 
-    sel.sort(key=lambda c: (c["top"], c["x0"]))
+def cell_text_from_chars(chars, y_tol=1.2, x_gap=1.0) -> str:
+    # chars must already be in (top, x0) order; parse_pdf sorts the page once
+    if not chars:
+        return ""
 
     lines = []
     cur = []
     cur_top = None
-    for ch in sel:
+    for ch in chars:
         if cur_top is None or abs(ch["top"] - cur_top) <= y_tol:
             cur.append(ch)
             cur_top = ch["top"] if cur_top is None else (cur_top * 0.7 + ch["top"] * 0.3)
@@ -308,29 +504,35 @@ def cell_text_from_chars(
     out_lines = []
     for line in lines:
         line.sort(key=lambda c: c["x0"])
-        s = ""
+        parts = []
         prev = None
         for ch in line:
             if prev is not None and (ch["x0"] - prev["x1"]) > x_gap:
-                s += " "
-            s += ch["text"]
+                parts.append(" ")
+            parts.append(ch["text"])
             prev = ch
-        out_lines.append(s.strip())
+        out_lines.append("".join(parts).strip())
 
     return normalize_ws(" ".join([l for l in out_lines if l]))
 
 
-def detect_header_row(grid: List[List[str]], expected_classes: List[str]) -> Optional[int]:
+def detect_header_row(
+    grid: Dict[Tuple[int, int], str],
+    n_rows: int,
+    n_cols: int,
+    expected_classes: List[str],
+) -> Optional[int]:
+    """grid is sparse: only non-empty cells are present, keyed by (row, col)."""
     expected_set = set(expected_classes)
     best_r = None
     best_score = -1
 
     # check first ~12 rows (header is near top)
-    for r in range(min(12, len(grid))):
-        row_text = " ".join(grid[r][1:])  # ignore time col
+    for r in range(min(HEADER_SEARCH_ROWS, n_rows)):
+        row_text = " ".join(grid[(r, c)] for c in range(1, n_cols) if (r, c) in grid)  # ignore time col
         found = set()
         for cls in expected_set:
-            if re.search(rf"\b{re.escape(cls)}\b", row_text):
+            if CLASS_LABEL_RE[cls].search(row_text):
                 found.add(cls)
         score = len(found)
         if score > best_score:
@@ -352,8 +554,9 @@ def extract_header_note(header_cell: str, cls: str) -> str:
         return ""
 
     # if it contains the class token, strip it out
-    if re.search(rf"\b{re.escape(cls)}\b", txt):
-        note = re.sub(rf"\b{re.escape(cls)}\b", "", txt, count=1).strip()
+    label_re = CLASS_LABEL_RE[cls]
+    if label_re.search(txt):
+        note = label_re.sub("", txt, count=1).strip()
         note = normalize_ws(note)
         note = note.strip(" -–|,.;:").strip()
         return note
@@ -366,72 +569,97 @@ def extract_header_note(header_cell: str, cls: str) -> str:
     return ""
 
 
-def parse_day_block(day_crop, x_bounds: List[float], expected_classes: List[str]) -> Tuple[Dict[str, List[str]], Dict[str, str]]:
-    y_bounds = get_y_bounds_for_crop(day_crop)
+def column_class_map(x_bounds: List[float], expected_classes: List[str]) -> Dict[int, str]:
+    # fixed column mapping by index (stable even if header cell contains extra text)
+    n_cols = len(x_bounds) - 1
+    max_class_cols = min(len(expected_classes), n_cols - 1)
+    return {c: expected_classes[c - 1] for c in range(1, 1 + max_class_cols)}
+
+
+def parse_day_block(
+    day_chars,
+    day_horiz,
+    x_bounds: List[float],
+    expected_classes: List[str],
+    col_to_class: Dict[int, str],
+) -> Tuple[Dict[str, List[str]], Dict[str, str]]:
+    y_bounds = get_y_bounds(day_horiz)
     if len(y_bounds) < 5:
         return {}, {}
 
-    chars = day_crop.chars
     n_rows = len(y_bounds) - 1
     n_cols = len(x_bounds) - 1
+    cells = build_cell_char_map(day_chars, x_bounds, y_bounds)
 
-    grid = [["" for _ in range(n_cols)] for _ in range(n_rows)]
-    for r in range(n_rows):
-        ry0, ry1 = y_bounds[r], y_bounds[r + 1]
-        for c in range(n_cols):
-            cx0, cx1 = x_bounds[c], x_bounds[c + 1]
-            grid[r][c] = cell_text_from_chars(chars, cx0, cx1, ry0, ry1)
+    # sparse text grid; only the rows that can hold the header are formatted up front
+    grid: Dict[Tuple[int, int], str] = {
+        key: cell_text_from_chars(cell_chars)
+        for key, cell_chars in cells.items()
+        if key[0] < HEADER_SEARCH_ROWS
+    }
 
-    header_r = detect_header_row(grid, expected_classes)
+    header_r = detect_header_row(grid, n_rows, n_cols, expected_classes)
     if header_r is None:
         return {}, {}
 
-    # fixed column mapping by index (stable even if header cell contains extra text)
-    max_class_cols = min(len(expected_classes), n_cols - 1)
-    col_to_class = {c: expected_classes[c - 1] for c in range(1, 1 + max_class_cols)}
+    def cell_text(r: int, c: int) -> str:
+        if r < HEADER_SEARCH_ROWS:
+            return grid.get((r, c), "")
+        return cell_text_from_chars(cells.get((r, c)))
 
     # extract day notes from header row (cab./lab./etc)
     day_notes: Dict[str, str] = {}
-    header_row = grid[header_r]
     for c, cls in col_to_class.items():
-        note = extract_header_note(header_row[c] if c < len(header_row) else "", cls)
+        note = extract_header_note(grid.get((header_r, c), ""), cls)
         if note:
             day_notes[cls] = note
 
-    # schedule entries
-    day_schedule: Dict[str, List[str]] = {cls: [] for cls in expected_classes}
+    # schedule entries; dict keys keep first-seen order and dedupe in O(1)
+    day_schedule: Dict[str, Dict[str, None]] = {cls: {} for cls in expected_classes}
 
+    match_time = TIME_RE.match
+    class_labels = frozenset(expected_classes)
     for r in range(header_r + 1, n_rows):
-        time_txt = normalize_ws(grid[r][0])
-        if not is_time_slot(time_txt):
+        time_txt = cell_text(r, 0)  # already whitespace-normalized
+        if not match_time(time_txt):
             continue
         time_out = normalize_time_text(time_txt)
 
         for c, cls in col_to_class.items():
-            subj = normalize_subject(grid[r][c])
+            subj = normalize_subject(cell_text(r, c))
             if not subj:
                 continue
             # prevent weird accidental echo of class labels in cells
-            if subj in expected_classes:
+            if subj in class_labels:
                 continue
-            entry = f"{time_out} | {subj}"
-            if entry not in day_schedule[cls]:
-                day_schedule[cls].append(entry)
+            day_schedule[cls][f"{time_out} | {subj}"] = None
 
     # drop empties
-    day_schedule = {k: v for k, v in day_schedule.items() if v}
-    return day_schedule, day_notes
+    return {k: list(v) for k, v in day_schedule.items() if v}, day_notes
 
 
-def parse_pdf(pdf_path: str, expected_classes: List[str]) -> Tuple[Dict[str, Dict[str, List[str]]], Dict[str, Dict[str, str]]]:
-    final_schedule: Dict[str, Dict[str, List[str]]] = {}
+def parse_pdf(pdf_bytes: bytes, expected_classes: List[str]) -> Tuple[Dict[str, Dict[str, List[str]]], Dict[str, Dict[str, str]]]:
+    # flat (cls, day) keys while collecting; nested into cls -> day at the end
+    entries_by_key: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+    seen: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
     final_notes: Dict[str, Dict[str, str]] = {}
 
-    with pdfplumber.open(pdf_path) as pdf:
+    with pdfplumber.open(io.BytesIO(pdf_bytes), pages=[1]) as pdf:
         page = pdf.pages[0]
-        x_bounds = get_global_x_bounds(page)
-
-        zones = find_day_zones(page)
+        page_chars = page.chars
+        verts, _ = split_edges(page.edges)
+        x_bounds = get_global_x_bounds(verts)
+        col_to_class = column_class_map(x_bounds, expected_classes)
+        graphics, graphic_bottoms = graphics_by_bottom(page.lines, page.rects, page.curves)
+
+        # sort once in reading order; each day band is then a bisect slice
+        # with the same chars (clipped the same way) a page.crop() would give,
+        # and every cell bucket comes out already sorted
+        chars = sorted(page_chars, key=lambda ch: (ch["top"], ch["x0"]))
+        char_tops = [ch["top"] for ch in chars]
+        max_h = max((ch["bottom"] - ch["top"] for ch in chars), default=0)
+
+        zones = find_day_zones(page_chars)
         if not zones:
             raise RuntimeError("Could not find day headers (MONTAG/DIENSTAG/...).")
 
@@ -440,16 +668,20 @@ def parse_pdf(pdf_path: str, expected_classes: List[str]) -> Tuple[Dict[str, Dic
             y_start = max(0, z["top"] - 8)
             y_end = zones[i + 1]["top"] - 6 if i + 1 < len(zones) else page.height
 
-            crop = page.crop((0, y_start, page.width, y_end))
-            day_block, day_notes = parse_day_block(crop, x_bounds, expected_classes)
+            band = (0, y_start, page.width, y_end)
+            day_chars = band_chars(chars, char_tops, max_h, band)
+            day_horiz = band_horizontals(graphics, graphic_bottoms, band)
+            day_block, day_notes = parse_day_block(day_chars, day_horiz, x_bounds, expected_classes, col_to_class)
 
             # merge schedule
             for cls, entries in day_block.items():
-                final_schedule.setdefault(cls, {})
-                final_schedule[cls].setdefault(day_name, [])
+                key = (cls, day_name)
+                day_seen = seen[key]
+                day_entries = entries_by_key[key]
                 for e in entries:
-                    if e not in final_schedule[cls][day_name]:
-                        final_schedule[cls][day_name].append(e)
+                    if e not in day_seen:
+                        day_seen.add(e)
+                        day_entries.append(e)
 
             # merge notes
             for cls, note in day_notes.items():
@@ -460,6 +692,10 @@ def parse_pdf(pdf_path: str, expected_classes: List[str]) -> Tuple[Dict[str, Dic
                 else:
                     final_notes[cls][day_name] = note
 
+    final_schedule: Dict[str, Dict[str, List[str]]] = {}
+    for (cls, day_name), entries in entries_by_key.items():
+        final_schedule.setdefault(cls, {})[day_name] = entries
+
     final_notes = {cls: dn for cls, dn in final_notes.items() if dn}
     return final_schedule, final_notes
 
@@ -470,7 +706,7 @@ def notify_worker(title: str, body: str, data: dict) -> None:
         return
 
     try:
-        resp = requests.post(
+        resp = SESSION.post(
             f"{WORKER_NOTIFY_URL}?key={WORKER_AUTH_KEY}",
             json={"title": title, "body": body, "data": data},
             timeout=30,
@@ -480,11 +716,52 @@ def notify_worker(title: str, body: str, data: dict) -> None:
         print("Worker notify failed:", repr(e))
 
 
-def download_to_tmp(pdf_url: str, tmp_name: str) -> None:
-    resp = requests.get(pdf_url, headers=HEADERS, timeout=60)
-    resp.raise_for_status()
-    with open(tmp_name, "wb") as f:
-        f.write(resp.content)
+def download_pdf(pdf_url: str, old_source: Optional[Dict[str, str]] = None) -> Optional[Tuple[bytes, Dict[str, str]]]:
+    """
+    Download pdf_url into memory. When old_source carries the validators
+    of a previous run, the request is conditional and None is returned on
+    304, or on a 200 whose validators and Content-Length all match the
+    stored ones. Otherwise returns the body plus its sha256 and the new
+    validators.
+    """
+    headers: Dict[str, str] = {}
+    if old_source:
+        if old_source.get("etag"):
+            headers["If-None-Match"] = old_source["etag"]
+        if old_source.get("last_modified"):
+            headers["If-Modified-Since"] = old_source["last_modified"]
+
+    with SESSION.get(pdf_url, headers=headers, timeout=60, stream=True) as resp:
+        if resp.status_code == 304:
+            return None
+        resp.raise_for_status()
+
+        validators = {
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "content_length": resp.headers.get("Content-Length"),
+        }
+        # some servers ignore the conditional headers and send a full 200; if
+        # the validators and the length all still match, don't read the body
+        if (
+            old_source
+            and old_source.get("content_length")
+            and (old_source.get("etag") or old_source.get("last_modified"))
+            and all(validators[k] == old_source[k] for k in validators if old_source.get(k))
+        ):
+            return None
+
+        # hash while the body arrives instead of in a second pass over it
+        h = hashlib.sha256()
+        chunks: List[bytes] = []
+        for chunk in resp.iter_content(chunk_size=1 << 20):
+            h.update(chunk)
+            chunks.append(chunk)
+        data = b"".join(chunks)
+
+        meta = {"pdf_hash": h.hexdigest()}
+        meta.update((k, v) for k, v in validators.items() if v)
+    return data, meta
 
 
 def load_old_state() -> dict:
@@ -498,14 +775,15 @@ def load_old_state() -> dict:
 
 
 def main() -> None:
+    old = load_old_state()
+    old_sources = (old.get("sources") or {})
+
     # Discover latest PDFs by content (robust against missing/renamed/swapped links)
-    found = pick_latest_pdfs_by_kind(max_probe=10)  # you can tweak
+    found = pick_latest_pdfs_by_kind(max_probe=10, old_sources=old_sources)  # you can tweak
     if not found:
         print("No usable timetable PDFs found on site.")
         return
 
-    old = load_old_state()
-    old_sources = (old.get("sources") or {})
     old_schedule: Dict[str, Dict[str, List[str]]] = (old.get("schedule") or {})
     old_day_notes: Dict[str, Dict[str, str]] = (old.get("day_notes") or {})
 
@@ -515,40 +793,59 @@ def main() -> None:
 
     sources_out: Dict[str, Dict[str, str]] = dict(old_sources)
     changed_any = (not os.path.exists(OUTPUT_FILE))
+    validators_added = False
+    to_parse: List[Tuple[bytes, List[str]]] = []
 
     for kind, info in found.items():
         pdf_url = info["url"]
-        tmp = info["tmp"]
+        pdf_bytes = info["pdf"]
         expected_classes = KIND_TO_CLASSES[kind]
 
-        pdf_hash = file_hash(tmp)
-        old_hash = ((old_sources.get(kind) or {}).get("pdf_hash"))
+        if pdf_bytes is None:
+            # server said 304: keep the previous source + schedule for this kind
+            continue
+
+        pdf_hash = info["pdf_hash"]
+        old_source = old_sources.get(kind) or {}
+        old_hash = old_source.get("pdf_hash")
 
         sources_out[kind] = {"source_pdf": pdf_url, "pdf_hash": pdf_hash}
-        if pdf_hash != old_hash:
-            changed_any = True
+        for key in ("etag", "last_modified", "content_length"):
+            if info.get(key):
+                sources_out[kind][key] = info[key]
+        if pdf_hash == old_hash:
+            # same content (e.g. re-uploaded under a new name): keep previous entries, skip the parse
+            if not (old_source.get("etag") or old_source.get("last_modified")):
+                validators_added = validators_added or bool(info.get("etag") or info.get("last_modified"))
+            continue
+        changed_any = True
 
         # remove old entries for this kind (so they get replaced cleanly)
         for cls in expected_classes:
             schedule_all.pop(cls, None)
             day_notes_all.pop(cls, None)
 
-        # parse + merge
-        try:
-            new_schedule, new_notes = parse_pdf(tmp, expected_classes)
-        finally:
-            try:
-                os.remove(tmp)
-            except OSError:
-                pass
+        to_parse.append((pdf_bytes, expected_classes))
+
+    # parsing is CPU-bound pure Python and the kinds are independent, so when
+    # both PDFs changed they are parsed in separate processes
+    if len(to_parse) > 1:
+        with ProcessPoolExecutor(max_workers=len(to_parse)) as ex:
+            parsed = list(ex.map(parse_pdf, *zip(*to_parse)))
+    else:
+        parsed = [parse_pdf(pdf_bytes, expected_classes) for pdf_bytes, expected_classes in to_parse]
 
+    # merge
+    for new_schedule, new_notes in parsed:
         for cls, days in new_schedule.items():
-            schedule_all.setdefault(cls, {})
+            cls_days = schedule_all.setdefault(cls, {})
             for day, entries in days.items():
-                schedule_all[cls].setdefault(day, [])
+                dst = cls_days.setdefault(day, [])
+                existing = set(dst)
                 for e in entries:
-                    if e not in schedule_all[cls][day]:
-                        schedule_all[cls][day].append(e)
+                    if e not in existing:
+                        existing.add(e)
+                        dst.append(e)
 
         for cls, dn in new_notes.items():
             day_notes_all.setdefault(cls, {})
@@ -559,19 +856,33 @@ def main() -> None:
                 else:
                     day_notes_all[cls][day] = note
 
-    if not changed_any and os.path.exists(OUTPUT_FILE):
+    # validators (ETag / Last-Modified) are saved even when the PDFs themselves
+    # didn't change if none were stored yet, so the next run can ask
+    # conditionally; validators that merely changed don't trigger a write, or a
+    # server that regenerates them would produce a commit every run
+    if not changed_any and not validators_added:
         print("No detected changes, skipping update.")
         return
 
+    updated_at = old.get("updated_at")
+    if changed_any or not updated_at:
+        updated_at = datetime.now(RO_TZ).strftime("%d.%m.%Y %H:%M")
+
     out = {
-        "updated_at": datetime.now(RO_TZ).strftime("%d.%m.%Y %H:%M"),
+        "updated_at": updated_at,
         "sources": sources_out,
         "schedule": schedule_all,
         "day_notes": {k: v for k, v in day_notes_all.items() if v},
     }
 
+    # encode in one go and write once (json.dump issues a write per token)
+    payload = json.dumps(out, ensure_ascii=False, indent=2)
     with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(out, f, ensure_ascii=False, indent=2)
+        f.write(payload)
+
+    if not changed_any:
+        print("Timetable unchanged; stored source validators in timetable.json.")
+        return
 
     print("Updated timetable.json | classes:", len(schedule_all), "| day_notes classes:", len(out["day_notes"]))
 